@@ -2,29 +2,20 @@ import time
 import xbee
 from machine import Pin, I2C
 
+import zb.types as t
 import zb.zdo as zdo
 import zb.zha as zha
+from zb.binding import BindingTable
+from zb.endpoints import EndpointTable
 
 import struct
 
-print(" +-------------------------------------+")
-print(" |          i2crelay                   |")
-print(" +-------------------------------------+\n")
-
-print("Waiting for data...\n")
-
-btn = Pin(Pin.board.D4, Pin.IN)
-last_button_state = 1
-
-i2c = I2C(1)
-
 CMD_CHANNEL_CTRL = 0x10
 relay_state = 0x0
 base_ep = 0xc0
 relay_count = 4
 
-serial_h = struct.unpack('I', xbee.atcmd('SH'))[0]
-serial_l = struct.unpack('I', xbee.atcmd('SL'))[0]
+last_button_state = 1
 
 capability_flags = 0x8E
 
@@ -32,6 +23,33 @@ reporting_tsn = 0
 
 heartbeat_timeout = 300000
 
+# Record received messages to capture.bin for replay with tools/replay.py
+capture_enabled = False
+capture = None
+
+heartbeat_time = 0
+
+
+def init():
+    """Set up the hardware and the tables the message handlers use."""
+    global btn, i2c, local_ieee, endpoints, max_payload, bindings, mgmt_bind_page_size
+
+    btn = Pin(Pin.board.D4, Pin.IN)
+    i2c = I2C(1)
+
+    local_ieee = xbee.atcmd('SH') + xbee.atcmd('SL')
+
+    endpoints = EndpointTable()
+    for r in range(relay_count):
+        endpoints.add(base_ep + r, 260, 0x0, 0x0, input_clusters=[0x0006])
+
+    # Maximum RF payload in bytes, responses are packed / paged to fit
+    max_payload = xbee.atcmd('NP')
+
+    bindings = BindingTable()
+    # tsn, status, entry count, start index and list length take 5 bytes, unicast entries are 21 bytes
+    mgmt_bind_page_size = max(1, (max_payload - 5) // 21)
+
 
 def print_message(message):
     print("Data received from {} >>".format(''.join('{:02x}'.format(x).upper() for x in message['sender_eui64'])))
@@ -45,29 +63,90 @@ def print_message(message):
     print("sender_eui64: {}".format(message['sender_eui64']))
 
 
+def send_zdo_response(message, cluster, response_frame):
+    xbee.transmit(message['sender_eui64'], response_frame,
+                  source_ep=message['source_ep'], dest_ep=message['dest_ep'],
+                  cluster=cluster, profile=message['profile'])
+
+
+def handle_bind_request(message, tsn, args):
+    src_address, src_ep, cluster, dst_address = args
+    if bytes(src_address[::-1]) != local_ieee:
+        status = zdo.Status.NOT_SUPPORTED
+    elif endpoints.simple_descriptor(src_ep) is None:
+        status = zdo.Status.INVALID_EP
+    elif dst_address.addrmode != zdo.MultiAddress.IEEE:
+        # xbee.transmit cannot address groups
+        status = zdo.Status.NOT_SUPPORTED
+    elif message['cluster'] == zdo.ZDOCmd.Bind_req:
+        status = bindings.bind(src_ep, cluster, bytes(dst_address.ieee[::-1]), dst_address.endpoint)
+    else:
+        status = bindings.unbind(src_ep, cluster, bytes(dst_address.ieee[::-1]), dst_address.endpoint)
+
+    response_cluster = zdo.ZDOCmd.Bind_rsp if message['cluster'] == zdo.ZDOCmd.Bind_req else zdo.ZDOCmd.Unbind_rsp
+    send_zdo_response(message, response_cluster, zdo.serialize_frame(tsn, response_cluster, (status,)))
+
+
+def handle_mgmt_bind_request(message, tsn, args):
+    start_index = args[0]
+    local_eui64 = t.EUI64_T(local_ieee[::-1])
+    binding_list = [zdo.Binding(local_eui64, src_ep, cluster,
+                                zdo.MultiAddress(zdo.MultiAddress.IEEE, ieee=t.EUI64_T(dst[::-1]), endpoint=dst_ep))
+                    for src_ep, cluster, dst, dst_ep in bindings.entries(start_index, mgmt_bind_page_size)]
+    response_frame = zdo.serialize_frame(tsn, zdo.ZDOCmd.Mgmt_Bind_rsp, (zdo.Status.SUCCESS,), (len(bindings),),
+                                         (start_index,), (binding_list,))
+    send_zdo_response(message, zdo.ZDOCmd.Mgmt_Bind_rsp, response_frame)
+
+
 def handle_zdo_message(message):
-    tsn, args = zdo.deserialize_frame(message['cluster'], message['payload'])
+    try:
+        tsn, args = zdo.deserialize_frame(message['cluster'], message['payload'])
+    except ValueError as e:
+        # Malformed / truncated request, there is nothing reliable to answer
+        print("Dropping malformed ZDO request cluster {:04X}: {}".format(message['cluster'], e))
+        return
     print("ZDO request cluster {:04X}, args: ".format(message['cluster']), args)
     if message['cluster'] == zdo.ZDOCmd.Active_EP_req:
         if args[0] == xbee.atcmd('MY'):
+            # tsn, status, nwk and list length take 5 bytes, hubs that need the rest use Extended_Active_EP_req
             response_frame = zdo.serialize_frame(tsn, zdo.ZDOCmd.Active_EP_rsp, (zdo.Status.SUCCESS,), (args[0],),
-                                                 ([base_ep + r for r in range(relay_count)],))
-            xbee.transmit(message['sender_eui64'], response_frame,
-                          source_ep=message['source_ep'], dest_ep=message['dest_ep'],
-                          cluster=zdo.ZDOCmd.Active_EP_rsp, profile=message['profile'])
+                                                 (endpoints.active[:max_payload - 5],))
+            send_zdo_response(message, zdo.ZDOCmd.Active_EP_rsp, response_frame)
+    elif message['cluster'] == zdo.ZDOCmd.Extended_Active_EP_req:
+        if args[0] == xbee.atcmd('MY'):
+            start_index = args[1]
+            response_frame = zdo.serialize_frame(tsn, zdo.ZDOCmd.Extended_Active_EP_rsp, (zdo.Status.SUCCESS,),
+                                                 (args[0],), (len(endpoints),), (start_index,),
+                                                 (endpoints.active[start_index:start_index + max_payload - 6],))
+            send_zdo_response(message, zdo.ZDOCmd.Extended_Active_EP_rsp, response_frame)
     elif message['cluster'] == zdo.ZDOCmd.Simple_Desc_req:
         if args[0] == xbee.atcmd('MY'):
-            # n, t = param_schema(ZDOCmd.Simple_Desc_rsp, 2)
-            # print(n, t)
-
+            descriptor = endpoints.simple_descriptor(args[1])
+            if descriptor is not None:
+                status = zdo.Status.SUCCESS
+            elif args[1] == 0x00 or args[1] >= 0xF1:
+                status = zdo.Status.INVALID_EP
+            else:
+                status = zdo.Status.NOT_ACTIVE
+            # an empty descriptor tuple serializes as a zero length descriptor
             response_frame = zdo.serialize_frame(tsn, zdo.ZDOCmd.Simple_Desc_rsp,
-                                                 (zdo.Status.SUCCESS,),
+                                                 (status,),
                                                  (args[0],),
-                                                 (args[1], 260, 0x0, 0x0, [0x6], []))
-            xbee.transmit(message['sender_eui64'], response_frame,
-                          source_ep=message['source_ep'], dest_ep=message['dest_ep'],
-                          cluster=zdo.ZDOCmd.Simple_Desc_rsp, profile=message['profile'])
-
+                                                 descriptor or ())
+            send_zdo_response(message, zdo.ZDOCmd.Simple_Desc_rsp, response_frame)
+    elif message['cluster'] == zdo.ZDOCmd.Match_Desc_req:
+        my_nwk = xbee.atcmd('MY')
+        if args[0] == my_nwk or args[0] >= 0xFFFC:
+            matches = endpoints.match(args[1], args[2], args[3])
+            # broadcast requests are only answered on a match
+            if matches or not message['broadcast']:
+                response_frame = zdo.serialize_frame(tsn, zdo.ZDOCmd.Match_Desc_rsp, (zdo.Status.SUCCESS,),
+                                                     (my_nwk,), (matches[:max_payload - 5],))
+                send_zdo_response(message, zdo.ZDOCmd.Match_Desc_rsp, response_frame)
+    elif message['cluster'] in (zdo.ZDOCmd.Bind_req, zdo.ZDOCmd.Unbind_req):
+        handle_bind_request(message, tsn, args)
+    elif message['cluster'] == zdo.ZDOCmd.Mgmt_Bind_req:
+        handle_mgmt_bind_request(message, tsn, args)
     else:
         print("No handler for ZDO message:")
         print_message(message)
@@ -79,6 +158,12 @@ def set_relays():
     i2c.writeto(17, cmd_bytes)
 
 
+def send_zha_response(message, response_frame):
+    xbee.transmit(message['sender_eui64'], response_frame,
+                  source_ep=message['dest_ep'], dest_ep=message['source_ep'],
+                  cluster=message['cluster'], profile=message['profile'])
+
+
 def handle_zha_message(message):
     frc, tsn, command_id, args, data = zha.deserialize_frame(message['cluster'], message['payload'])
     # print(frc, tsn, command_id, args, data)
@@ -92,16 +177,22 @@ def handle_zha_message(message):
                 relay_state &= ~(1 << relay_id)
             elif command_id == 1:
                 relay_state |= (1 << relay_id)
+            elif command_id == 2:
+                relay_state ^= (1 << relay_id)
 
             set_relays()
             print('executing {} against relay_id {}'.format(cmd_string, relay_id))
             publish_relay_state(relay_id)
         elif frc.frame_type == zha.FrameType.GLOBAL_COMMAND:
             if command_id == 0:
-                response_frame = zha.serialize_attribute_response(tsn, relay_id, args[0])
-                xbee.transmit(message['sender_eui64'], response_frame,
-                              source_ep=message['source_ep'], dest_ep=message['dest_ep'],
-                              cluster=zdo.ZDOCmd.Simple_Desc_rsp, profile=message['profile'])
+                response_frames = zha.serialize_attribute_response(tsn, relay_state & (1 << relay_id), args[0],
+                                                                   max_payload)
+                for response_frame in response_frames:
+                    send_zha_response(message, response_frame)
+            elif command_id == 0x0c:    # discover attributes
+                response_frame = zha.serialize_discover_attributes_response(tsn, ((0x0000, 0x10),), args[0], args[1],
+                                                                            max_payload)
+                send_zha_response(message, response_frame)
             elif command_id == 0x0b:    # default response to report attributes
                 print('Attribute report resulted in response status {}'.format(args[1]))
 
@@ -115,35 +206,67 @@ def publish_relay_state(relay_id):
 
     global reporting_tsn
     state = True if relay_state & (1 << relay_id) else False
-    msg = zha.serialize_on_off_report(reporting_tsn & 0xFF, state)
+    msgs = zha.serialize_on_off_report(reporting_tsn & 0xFF, state, max_payload)
     reporting_tsn += 1
     ep = relay_id + base_ep
-    xbee.transmit(xbee.ADDR_COORDINATOR, msg,
-                  source_ep=ep, dest_ep=ep,
-                  cluster=0x0006, profile=260)
+    targets = bindings.lookup(ep, 0x0006)
+    for msg in msgs:
+        if not targets:
+            xbee.transmit(xbee.ADDR_COORDINATOR, msg,
+                          source_ep=ep, dest_ep=ep,
+                          cluster=0x0006, profile=260)
+        for dst, dst_ep in targets:
+            xbee.transmit(dst, msg,
+                          source_ep=ep, dest_ep=dst_ep,
+                          cluster=0x0006, profile=260)
+
+
+def handle_message(message):
+    ai = xbee.atcmd('AI')
+    if ai != 0:
+        print('handle message: Not associated to a PAN (current state is {}.  Cannot handle message'.format(ai))
+    else:
+        # print_message(message)
+        if message['profile'] == 0 and message['dest_ep'] == 0:
+            handle_zdo_message(message)
+        elif message['profile'] == 260:  # zha profile
+            handle_zha_message(message)
+        else:
+            print("No handler for message:")
+            print_message(message)
+
+
+def start():
+    """Boot up to the point where the receive loop can start serving messages."""
+    global capture, heartbeat_time
 
+    print(" +-------------------------------------+")
+    print(" |          i2crelay                   |")
+    print(" +-------------------------------------+\n")
 
-set_relays()
-for r in range(relay_count):
-    publish_relay_state(r)
-heartbeat_time = time.ticks_ms()
+    init()
+    set_relays()
+
+    if capture_enabled:
+        from zb.capture import FrameCapture
+        capture = FrameCapture()
+
+    print("Waiting for data...\n")
+
+    # Serve anything already queued first, the initial state reports go out on the first idle pass
+    heartbeat_time = time.ticks_add(time.ticks_ms(), -heartbeat_timeout)
+
+
+def service():
+    """Run one pass of the receive loop."""
+    global heartbeat_time
 
-while True:
     # Check if the XBee has any messages in the queue.
     received_msg = xbee.receive()
     if received_msg:
-        ai = xbee.atcmd('AI')
-        if ai != 0:
-            print('handle message: Not associated to a PAN (current state is {}.  Cannot handle message'.format(ai))
-        else:
-            # print_message(received_msg)
-            if received_msg['profile'] == 0 and received_msg['dest_ep'] == 0:
-                handle_zdo_message(received_msg)
-            elif received_msg['profile'] == 260:  # zha profile
-                handle_zha_message(received_msg)
-            else:
-                print("No handler for message:")
-                print_message(received_msg)
+        if capture:
+            capture.record(received_msg, time.ticks_ms())
+        handle_message(received_msg)
     else:
         now = time.ticks_ms()
         delta = time.ticks_diff(now, heartbeat_time)
@@ -151,5 +274,15 @@ while True:
             heartbeat_time = now
             for r in range(relay_count):
                 publish_relay_state(r)
-        time.sleep(0.1)
+        else:
+            time.sleep(0.1)
+
+
+def main():
+    start()
+    while True:
+        service()
+
 
+if __name__ == '__main__':
+    main()
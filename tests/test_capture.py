@@ -0,0 +1,37 @@
+from zb.capture import FrameCapture, read_capture
+
+
+def message(tsn, payload_size=3):
+    return {
+        'cluster': 0x0006, 'source_ep': 0x01, 'dest_ep': 0xc0, 'profile': 260, 'broadcast': False,
+        'sender_nwk': 0x0000, 'sender_eui64': bytes(8), 'payload': bytes([0x01, tsn, 0x01]) + bytes(payload_size - 3),
+    }
+
+
+def test_round_trip_across_laps_and_reopen(tmp_path):
+    path = str(tmp_path / "capture.bin")
+    capture = FrameCapture(path, capacity=1024)
+    for tsn in range(60):
+        capture.record(message(tsn, 3 + tsn % 5 * 10), tsn)
+    capture.close()
+
+    capture = FrameCapture(path, capacity=1024)
+    for tsn in range(60, 70):
+        capture.record(message(tsn), tsn)
+    capture.close()
+
+    ticks = [m['ticks'] for m in read_capture(path)]
+    assert ticks == list(range(ticks[0], 70))
+    assert len(ticks) > 15
+
+
+def test_oversized_payload_is_flagged(tmp_path):
+    path = str(tmp_path / "capture.bin")
+    capture = FrameCapture(path, capacity=1024, max_payload=8)
+    capture.record(message(1), 1)
+    capture.record(message(2, 20), 2)
+    capture.close()
+
+    first, second = read_capture(path)
+    assert not first['truncated'] and first['payload'] == b"\x01\x01\x01"
+    assert second['truncated'] and len(second['payload']) == 8
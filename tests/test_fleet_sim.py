@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools'))
+
+import fleet_sim  # noqa: E402
+
+
+def transmit(fleet, t, sender):
+    frame = fleet_sim.Frame(sender, True, 7)
+    frame.nb = 0
+    frame.be = fleet_sim.MIN_BE
+    fleet.cca(t, frame)
+    return frame
+
+
+def test_frames_inside_vulnerable_window_collide():
+    fleet = fleet_sim.Fleet([], {'seed': 1})
+    first = transmit(fleet, 1000, 0)
+    second = transmit(fleet, 1000 + fleet_sim.VULNERABLE_US - 1, 1)
+    assert fleet_sim.VULNERABLE_US == 320
+    assert first.collided and second.collided
+    assert fleet.transmissions == 2
+
+
+def test_frames_outside_vulnerable_window_back_off():
+    fleet = fleet_sim.Fleet([], {'seed': 1})
+    first = transmit(fleet, 1000, 0)
+    second = transmit(fleet, 1000 + fleet_sim.VULNERABLE_US, 1)
+    assert not first.collided
+    assert second.nb == 1
+    assert fleet.transmissions == 1
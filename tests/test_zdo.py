@@ -0,0 +1,19 @@
+import zb.zdo as zdo
+
+
+def test_simple_desc_rsp_with_descriptor():
+    frame = zdo.serialize_frame(1, zdo.ZDOCmd.Simple_Desc_rsp, (zdo.Status.SUCCESS,), (0x1234,),
+                                (0xc0, 260, 0x0, 0x0, [0x0006], []))
+    assert frame == b"\x01\x00\x34\x12\x0a\xc0\x04\x01\x00\x00\x00\x01\x06\x00\x00"
+
+
+def test_simple_desc_rsp_without_descriptor():
+    frame = zdo.serialize_frame(1, zdo.ZDOCmd.Simple_Desc_rsp, (zdo.Status.NOT_ACTIVE,), (0x1234,), ())
+    assert frame == b"\x01\x83\x34\x12\x00"
+
+
+def test_bind_req_reserved_address_mode():
+    payload = b"\x07" + bytes(range(8)) + b"\xc0\x06\x00" + b"\x02\x01\x02"
+    tsn, args = zdo.deserialize_frame(zdo.ZDOCmd.Bind_req, payload)
+    assert tsn == 7
+    assert args[3].addrmode == 0x02
@@ -0,0 +1,80 @@
+import zb.zha as zha
+
+HEADER_SIZE = 3     # frame control, tsn, command id
+SUPPORTED_SIZE = 5  # attribute id, status, type id, value
+UNSUPPORTED_SIZE = 3  # attribute id, status
+
+
+def test_records_filling_max_payload_exactly_share_a_frame():
+    records = [b"abc"] * 4
+    frames = zha.pack_records(b"H", records, 1 + 4 * 3)
+    assert frames == [b"Habcabcabcabc"]
+
+
+def test_one_byte_over_max_payload_starts_a_new_frame():
+    records = [b"abc"] * 4
+    frames = zha.pack_records(b"H", records, 1 + 4 * 3 - 1)
+    assert frames == [b"Habcabcabc", b"Habc"]
+
+
+def test_no_records_gives_header_only_frame():
+    assert zha.pack_records(b"H", [], 10) == [b"H"]
+
+
+def test_record_larger_than_limit_is_sent_on_its_own():
+    frames = zha.pack_records(b"H", [b"ab", b"0123456789", b"cd"], 6)
+    assert frames == [b"Hab", b"H0123456789", b"Hcd"]
+
+
+def test_read_attributes_record_sizes():
+    supported, = zha.serialize_attribute_response(1, True, [0x0000], 82)
+    unsupported, = zha.serialize_attribute_response(1, True, [0x4000], 82)
+    assert len(supported) == HEADER_SIZE + SUPPORTED_SIZE
+    assert supported[HEADER_SIZE:] == b"\x00\x00\x00\x10\x01"
+    assert len(unsupported) == HEADER_SIZE + UNSUPPORTED_SIZE
+    assert unsupported[HEADER_SIZE:] == b"\x00\x40\x86"
+
+
+def test_read_attributes_uses_minimal_frame_count():
+    attributes = list(range(60))    # on_off plus 59 unsupported attributes
+    frames = zha.serialize_attribute_response(7, False, attributes, 82)
+    assert [len(frame) for frame in frames] == [80, 81, 30]
+    assert all(frame[:HEADER_SIZE] == b"\x18\x07\x01" for frame in frames)
+    payload = sum(len(frame) - HEADER_SIZE for frame in frames)
+    assert payload == SUPPORTED_SIZE + 59 * UNSUPPORTED_SIZE
+
+
+def test_read_attributes_at_exact_boundary():
+    # header + supported + 3 unsupported == 17 bytes
+    assert [len(f) for f in zha.serialize_attribute_response(1, True, range(4), 17)] == [17]
+    assert [len(f) for f in zha.serialize_attribute_response(1, True, range(4), 16)] == [14, 6]
+
+
+def test_supported_record_larger_than_limit_is_sent_alone():
+    frames = zha.serialize_attribute_response(1, True, [0x0001, 0x0000, 0x0002], 6)
+    assert [len(frame) for frame in frames] == [6, 8, 6]
+
+
+def test_on_off_report_fits_one_frame():
+    frames = zha.serialize_on_off_report(5, True, 82)
+    assert frames == [b"\x18\x05\x0a\x00\x00\x10\x01"]
+
+
+def test_discover_attributes_complete():
+    frame = zha.serialize_discover_attributes_response(2, [(0x0000, 0x10)], 0, 10, 82)
+    # server to client with default response disabled, discovery complete
+    assert frame == b"\x18\x02\x0d\x01\x00\x00\x10"
+
+
+def test_discover_attributes_truncated_to_max_payload():
+    attributes = [(0x4001, 0x21), (0x0000, 0x10), (0x4000, 0x10)]
+    frame = zha.serialize_discover_attributes_response(2, attributes, 0, 10, HEADER_SIZE + 1 + 2 * 3)
+    assert frame == b"\x18\x02\x0d\x00" + b"\x00\x00\x10" + b"\x00\x40\x10"
+
+
+def test_discover_attributes_truncated_to_max_count_and_start_id():
+    attributes = [(0x4001, 0x21), (0x0000, 0x10), (0x4000, 0x10)]
+    frame = zha.serialize_discover_attributes_response(2, attributes, 0x0001, 1, 82)
+    assert frame == b"\x18\x02\x0d\x00" + b"\x00\x40\x10"
+    frame = zha.serialize_discover_attributes_response(2, attributes, 0x4001, 1, 82)
+    assert frame == b"\x18\x02\x0d\x01" + b"\x01\x40\x21"
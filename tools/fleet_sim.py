@@ -0,0 +1,363 @@
+"""Simulate a fleet of relay nodes sharing one channel and coordinator.
+
+    python tools/fleet_sim.py --nodes 2000 [--heartbeat-s 300] [--command-rate 2] [--duration-s 3600]
+
+Every node runs the firmware from main.py on the host simulator: heartbeat
+reports come from publish_relay_state() and hub commands are fed through
+handle_message(), so frame counts and sizes follow the firmware's reporting
+behaviour. A process pool runs the firmware for chunks of nodes, then the
+frames are played onto a single shared 2.4 GHz channel (unslotted CSMA/CA,
+collisions, MAC retries) and into a coordinator that serves incoming reports
+and outgoing commands from one FIFO queue.
+
+All nodes are treated as in range of each other and of the coordinator, so
+multi-hop routing is not modelled. Reports aggregate frames/s, channel and
+coordinator load, and command latency, measured from the hub issuing a
+command to the coordinator having processed the relay's state report.
+Heartbeats keep their boot phase for the whole run, so the busiest second
+is reported next to the averages, as is the share of generated frames that
+was delivered.
+"""
+import argparse
+import contextlib
+import heapq
+import io
+import math
+import multiprocessing
+import os
+import random
+import sys
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import hostsim  # noqa: E402
+
+COORDINATOR = -1
+
+# 802.15.4 O-QPSK at 250 kbit/s, times in microseconds
+BYTE_US = 32
+# PHY, MAC, NWK (with security) and APS headers around the APS payload
+FRAME_OVERHEAD = 51
+CCA_US = 128
+TURNAROUND_US = 192
+ACK_US = TURNAROUND_US + 11 * BYTE_US
+# A transmission is only sensed by CCA once the sender has turned its radio around
+# and is on air for a full CCA period; frames started within this window collide
+VULNERABLE_US = TURNAROUND_US + CCA_US
+UNIT_BACKOFF_US = 320
+MIN_BE = 3
+MAX_BE = 5
+MAX_CSMA_BACKOFFS = 4
+MAX_FRAME_RETRIES = 3
+
+
+def node_traffic(task):
+    """Run the firmware for a chunk of nodes, returning each node's traffic schedule.
+
+    A schedule is a list of (time_us, command_payload_len or None, frames), where
+    frames are the (payload_len, to_coordinator) pairs the node transmits at that
+    time for a heartbeat, or in response to the command.
+
+    Heartbeats repeat exactly every heartbeat_us from the node's boot offset,
+    the phase never drifts, so nodes that boot close together keep reporting
+    in the same burst for the whole run.
+    """
+    first_node, count, cfg = task
+    with contextlib.redirect_stdout(io.StringIO()):
+        firmware, radio = hostsim.load_firmware()
+        firmware.relay_count = cfg['relays']
+        firmware.init()
+
+    def sent():
+        frames = [(len(tx['payload']), tx['dest'] == radio.ADDR_COORDINATOR) for tx in radio.transmitted]
+        del radio.transmitted[:]
+        return frames
+
+    duration = cfg['duration_us']
+    heartbeat = cfg['heartbeat_us']
+    # commands per microsecond to each node
+    command_rate = cfg['command_rate'] / cfg['nodes'] / 1e6
+    schedules = []
+    for node in range(first_node, first_node + count):
+        rng = random.Random(cfg['seed'] * 1000003 + node)
+        firmware.relay_state = 0
+        firmware.reporting_tsn = rng.randrange(256)
+        schedule = []
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            # main() sends the first reports on its first idle pass after boot
+            t = rng.uniform(0, cfg['boot_spread_us'])
+            while t < duration:
+                for r in range(firmware.relay_count):
+                    firmware.publish_relay_state(r)
+                schedule.append((t, None, sent()))
+                t += heartbeat
+
+            t = rng.expovariate(command_rate) if command_rate else duration
+            tsn = 0
+            while t < duration:
+                relay = rng.randrange(firmware.relay_count)
+                payload = bytes((0x01, tsn, rng.randrange(3)))     # cluster command: off, on or toggle
+                tsn = (tsn + 1) & 0xFF
+                firmware.handle_message({
+                    'cluster': 0x0006, 'source_ep': 0x01, 'dest_ep': firmware.base_ep + relay, 'profile': 260,
+                    'broadcast': False, 'sender_nwk': 0x0000, 'sender_eui64': bytes(8), 'payload': payload,
+                })
+                schedule.append((t, len(payload), sent()))
+                t += rng.expovariate(command_rate)
+
+        schedule.sort(key=lambda event: event[0])
+        schedules.append(schedule)
+    return schedules
+
+
+class Frame:
+    __slots__ = ('sender', 'to_coordinator', 'length', 'command', 'nb', 'be', 'retries', 'start', 'end', 'collided')
+
+    def __init__(self, sender, to_coordinator, length, command=None):
+        self.sender = sender
+        self.to_coordinator = to_coordinator
+        self.length = length
+        self.command = command
+        self.retries = 0
+
+
+class Fleet:
+    """Discrete event model of the shared channel and the coordinator queue."""
+
+    def __init__(self, schedules, cfg):
+        self.cfg = cfg
+        self.rng = random.Random(cfg['seed'])
+        self.events = []
+        self.seq = 0
+
+        self.mac_queues = {}
+        self.in_flight = []
+        self.airtime_us = 0
+        self.transmissions = 0
+        self.generated = 0
+        self.delivered = 0
+        # per second of simulated time: airtime and delivered frames
+        self.second_airtime_us = {}
+        self.second_delivered = {}
+        self.collisions = 0
+        self.access_failures = 0
+        self.retry_failures = 0
+
+        self.coordinator_queue = deque()
+        self.coordinator_busy = False
+        self.coordinator_busy_us = 0
+        self.coordinator_processed = 0
+        self.coordinator_max_queue = 0
+
+        # indexed by command id: [issue time, node, response frames, latency]
+        self.commands = []
+
+        for node, schedule in enumerate(schedules):
+            for t, command_len, frames in schedule:
+                if command_len is None:
+                    for length, to_coordinator in frames:
+                        self.at(t, self.enqueue_frame, Frame(node, to_coordinator, length))
+                else:
+                    command = len(self.commands)
+                    self.commands.append([t, node, frames, None])
+                    self.at(t, self.coordinator_enqueue, Frame(COORDINATOR, False, command_len, command))
+
+    def at(self, t, action, *args):
+        heapq.heappush(self.events, (t, self.seq, action, args))
+        self.seq += 1
+
+    def run(self):
+        while self.events:
+            t, _seq, action, args = heapq.heappop(self.events)
+            action(t, *args)
+        return self.report()
+
+    # MAC layer
+
+    def enqueue_frame(self, t, frame):
+        self.generated += 1
+        queue = self.mac_queues.setdefault(frame.sender, deque())
+        queue.append(frame)
+        if len(queue) == 1:
+            self.start_csma(t, frame)
+
+    def start_csma(self, t, frame):
+        frame.nb = 0
+        frame.be = MIN_BE
+        self.at(t + self.rng.randrange(2 ** frame.be) * UNIT_BACKOFF_US + CCA_US, self.cca, frame)
+
+    def cca(self, t, frame):
+        if any(tx.start + VULNERABLE_US <= t < tx.end for tx in self.in_flight):
+            frame.nb += 1
+            frame.be = min(frame.be + 1, MAX_BE)
+            if frame.nb > MAX_CSMA_BACKOFFS:
+                self.access_failures += 1
+                self.frame_done(t, frame)
+            else:
+                self.at(t + self.rng.randrange(2 ** frame.be) * UNIT_BACKOFF_US + CCA_US, self.cca, frame)
+            return
+
+        frame.start = t
+        frame.end = t + (FRAME_OVERHEAD + frame.length) * BYTE_US + ACK_US
+        frame.collided = False
+        for tx in self.in_flight:
+            # started too recently to be sensed
+            if t < tx.start + VULNERABLE_US:
+                tx.collided = frame.collided = True
+        self.in_flight.append(frame)
+        self.transmissions += 1
+        self.airtime_us += frame.end - frame.start
+        second = int(frame.start // 1000000)
+        while second * 1000000 < frame.end:
+            overlap = min(frame.end, (second + 1) * 1000000) - max(frame.start, second * 1000000)
+            self.second_airtime_us[second] = self.second_airtime_us.get(second, 0) + overlap
+            second += 1
+        self.at(frame.end, self.transmission_end, frame)
+
+    def transmission_end(self, t, frame):
+        self.in_flight.remove(frame)
+        if frame.collided:
+            self.collisions += 1
+            frame.retries += 1
+            if frame.retries > MAX_FRAME_RETRIES:
+                self.retry_failures += 1
+                self.frame_done(t, frame)
+            else:
+                self.start_csma(t, frame)
+            return
+
+        self.delivered += 1
+        second = int(t // 1000000)
+        self.second_delivered[second] = self.second_delivered.get(second, 0) + 1
+        self.frame_done(t, frame)
+        if frame.sender == COORDINATOR:
+            node = self.commands[frame.command][1]
+            self.at(t + self.cfg['node_service_us'], self.node_handled, node, frame.command)
+        elif frame.to_coordinator:
+            self.coordinator_enqueue(t, frame)
+
+    def frame_done(self, t, frame):
+        queue = self.mac_queues[frame.sender]
+        queue.popleft()
+        if queue:
+            self.start_csma(t, queue[0])
+
+    def node_handled(self, t, node, command):
+        for length, to_coordinator in self.commands[command][2]:
+            self.enqueue_frame(t, Frame(node, to_coordinator, length, command))
+
+    # Coordinator
+
+    def coordinator_enqueue(self, t, frame):
+        self.coordinator_queue.append(frame)
+        self.coordinator_max_queue = max(self.coordinator_max_queue, len(self.coordinator_queue))
+        if not self.coordinator_busy:
+            self.coordinator_busy = True
+            self.at(t + self.cfg['coordinator_service_us'], self.coordinator_done)
+
+    def coordinator_done(self, t):
+        frame = self.coordinator_queue.popleft()
+        self.coordinator_processed += 1
+        self.coordinator_busy_us += self.cfg['coordinator_service_us']
+        if frame.sender == COORDINATOR:
+            # hub command, hand it to the coordinator's radio
+            self.enqueue_frame(t, frame)
+        elif frame.command is not None and self.commands[frame.command][3] is None:
+            self.commands[frame.command][3] = t - self.commands[frame.command][0]
+
+        if self.coordinator_queue:
+            self.at(t + self.cfg['coordinator_service_us'], self.coordinator_done)
+        else:
+            self.coordinator_busy = False
+
+    def report(self):
+        duration_s = self.cfg['duration_us'] / 1e6
+        latencies = sorted(command[3] for command in self.commands if command[3] is not None)
+        return {
+            'transmissions': self.transmissions,
+            'delivered': self.delivered,
+            'generated': self.generated,
+            'delivery_ratio': self.delivered / self.generated if self.generated else 1.0,
+            'frames_per_s': self.delivered / duration_s,
+            'peak_frames_per_s': max(self.second_delivered.values(), default=0),
+            'channel_utilisation': self.airtime_us / self.cfg['duration_us'],
+            'peak_channel_utilisation': max(self.second_airtime_us.values(), default=0) / 1e6,
+            'collisions': self.collisions,
+            'access_failures': self.access_failures,
+            'retry_failures': self.retry_failures,
+            'coordinator_frames_per_s': self.coordinator_processed / duration_s,
+            'coordinator_utilisation': self.coordinator_busy_us / self.cfg['duration_us'],
+            'coordinator_max_queue': self.coordinator_max_queue,
+            'commands': len(self.commands),
+            'commands_lost': len(self.commands) - len(latencies),
+            'latencies_us': latencies,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=500)
+    parser.add_argument('--relays', type=int, default=4, help='relays (endpoints) per node')
+    parser.add_argument('--heartbeat-s', type=float,
+                        help='heartbeat interval, defaults to the firmware heartbeat_timeout')
+    parser.add_argument('--command-rate', type=float, default=1.0, help='hub commands per second across the fleet')
+    parser.add_argument('--duration-s', type=float, default=3600)
+    parser.add_argument('--boot-spread-s', type=float, default=10,
+                        help='nodes boot uniformly within this window, 0 for a simultaneous power restore')
+    parser.add_argument('--coordinator-service-ms', type=float, default=2.0,
+                        help='coordinator time to process one frame')
+    parser.add_argument('--node-service-ms', type=float, default=5.0, help='node time to handle a command')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.heartbeat_s is None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            firmware, _radio = hostsim.load_firmware()
+        args.heartbeat_s = firmware.heartbeat_timeout / 1000
+
+    cfg = {
+        'nodes': args.nodes,
+        'relays': args.relays,
+        'heartbeat_us': args.heartbeat_s * 1e6,
+        'command_rate': args.command_rate,
+        'duration_us': args.duration_s * 1e6,
+        'boot_spread_us': args.boot_spread_s * 1e6,
+        'coordinator_service_us': args.coordinator_service_ms * 1000,
+        'node_service_us': args.node_service_ms * 1000,
+        'seed': args.seed,
+    }
+
+    chunk = max(1, math.ceil(args.nodes / (args.workers * 4)))
+    tasks = [(first, min(chunk, args.nodes - first), cfg) for first in range(0, args.nodes, chunk)]
+    with hostsim.flash_dir(), multiprocessing.Pool(args.workers) as pool:
+        schedules = [schedule for schedules in pool.map(node_traffic, tasks) for schedule in schedules]
+
+    result = Fleet(schedules, cfg).run()
+
+    print('nodes:            {} x {} relays, heartbeat {:g} s, {:g} commands/s, {:g} s simulated'.format(
+        args.nodes, args.relays, args.heartbeat_s, args.command_rate, args.duration_s))
+    print('frames:           {} delivered of {} generated ({:.2%}), {} transmissions'.format(
+        result['delivered'], result['generated'], result['delivery_ratio'], result['transmissions']))
+    print('frame rate:       {:.2f} frames/s average, {} frames/s busiest second'.format(
+        result['frames_per_s'], result['peak_frames_per_s']))
+    print('channel:          {:.2%} airtime average, {:.2%} busiest second'.format(
+        result['channel_utilisation'], result['peak_channel_utilisation']))
+    print('losses:           {} collisions, {} CSMA failures, {} retry failures'.format(
+        result['collisions'], result['access_failures'], result['retry_failures']))
+    print('coordinator:      {:.2f} frames/s, {:.2%} busy, max queue {}'.format(
+        result['coordinator_frames_per_s'], result['coordinator_utilisation'], result['coordinator_max_queue']))
+    latencies = result['latencies_us']
+    if latencies:
+        print('command latency:  p50 {:.1f} ms  p99 {:.1f} ms  worst {:.1f} ms  ({} of {} lost)'.format(
+            latencies[len(latencies) // 2] / 1000, latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] / 1000,
+            latencies[-1] / 1000, result['commands_lost'], result['commands']))
+    else:
+        print('command latency:  no commands completed ({} issued)'.format(result['commands']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Host side stand-ins for the XBee3 MicroPython modules.
+
+Installs ``xbee`` and ``machine`` modules backed by a SimulatedXBee, and the
+MicroPython ``time.ticks_*`` functions, so the firmware in main.py and zb can
+be imported and driven on a PC.
+"""
+import contextlib
+import importlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from collections import deque
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_AT = {
+    'SH': b'\x00\x13\xa2\x00',
+    'SL': b'\x41\x00\x00\x01',
+    'MY': 0x1234,
+    'AI': 0,
+    'NP': 82,
+}
+
+
+class SimulatedXBee:
+    ADDR_COORDINATOR = bytes(8)
+    ADDR_BROADCAST = b'\x00\x00\x00\x00\x00\x00\xff\xff'
+
+    def __init__(self, at=None):
+        self.at = dict(DEFAULT_AT)
+        self.at.update(at or {})
+        self.rx = deque()
+        self.transmitted = []
+
+    def atcmd(self, cmd, value=None):
+        if value is not None:
+            self.at[cmd] = value
+            return None
+        return self.at[cmd]
+
+    def transmit(self, dest, payload, source_ep=0xe8, dest_ep=0xe8, cluster=0x11, profile=0xc105, **kwargs):
+        self.transmitted.append({
+            'dest': dest, 'payload': bytes(payload), 'source_ep': source_ep, 'dest_ep': dest_ep,
+            'cluster': cluster, 'profile': profile,
+        })
+
+    def receive(self):
+        return self.rx.popleft() if self.rx else None
+
+
+# MicroPython ticks wrap at 2**30
+TICKS_PERIOD = 1 << 30
+
+
+def _ticks_ms():
+    return int(time.monotonic() * 1000) % TICKS_PERIOD
+
+
+def _ticks_add(ticks, delta):
+    return (ticks + delta) % TICKS_PERIOD
+
+
+def _ticks_diff(ticks1, ticks2):
+    return (ticks1 - ticks2 + TICKS_PERIOD // 2) % TICKS_PERIOD - TICKS_PERIOD // 2
+
+
+class _Pin:
+    IN = 0
+    OUT = 1
+
+    class board:
+        D4 = 4
+
+    def __init__(self, pin, mode=IN):
+        self.pin = pin
+
+    def value(self):
+        return 1
+
+
+class _I2C:
+    def __init__(self, bus):
+        self.writes = []
+
+    def writeto(self, addr, data):
+        self.writes.append((addr, bytes(data)))
+
+
+def install(at=None):
+    """Register simulated xbee / machine modules and return the SimulatedXBee behind them."""
+    radio = SimulatedXBee(at)
+
+    xbee = types.ModuleType('xbee')
+    for name in ('ADDR_COORDINATOR', 'ADDR_BROADCAST'):
+        setattr(xbee, name, getattr(radio, name))
+    for name in ('atcmd', 'transmit', 'receive'):
+        setattr(xbee, name, getattr(radio, name))
+    xbee.radio = radio
+
+    machine = types.ModuleType('machine')
+    machine.Pin = _Pin
+    machine.I2C = _I2C
+
+    sys.modules['xbee'] = xbee
+    sys.modules['machine'] = machine
+    for name, function in (('ticks_ms', _ticks_ms), ('ticks_add', _ticks_add), ('ticks_diff', _ticks_diff)):
+        if not hasattr(time, name):
+            setattr(time, name, function)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    return radio
+
+
+def unload_firmware():
+    """Forget main.py and the zb package so the next import starts cold."""
+    for name in list(sys.modules):
+        if name == 'main' or name == 'zb' or name.startswith('zb.'):
+            del sys.modules[name]
+
+
+def load_firmware(at=None):
+    """Import a fresh, initialised copy of main.py against a new SimulatedXBee, returning (module, radio)."""
+    radio = install(at)
+    sys.modules.pop('main', None)
+    firmware = importlib.import_module('main')
+    firmware.init()
+    return firmware, radio
+
+
+@contextlib.contextmanager
+def flash_dir():
+    """Run in a temporary directory standing in for the XBee flash filesystem.
+
+    Handlers may write files (e.g. bindings.bin), this keeps them out of the working tree.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            yield workdir
+        finally:
+            os.chdir(cwd)
+
+
+class HeapPeak:
+    """Measure the heap peak above the starting allocation of a block while tracemalloc is tracing.
+
+    bytes stays 0 when tracemalloc is not tracing.
+    """
+
+    def __init__(self):
+        self.bytes = 0
+        self._baseline = 0
+
+    def __enter__(self):
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc_info):
+        self.bytes = tracemalloc.get_traced_memory()[1] - self._baseline
+        return False
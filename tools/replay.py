@@ -0,0 +1,103 @@
+"""Replay a frame capture through the firmware message handlers on the host.
+
+Capture on the device by setting capture_enabled = True in main.py, copy
+capture.bin off the XBee, then:
+
+    python tools/replay.py capture.bin [--speed recorded|max] [--repeat N]
+
+Reports throughput, per message handling latency and heap allocations so
+firmware versions can be compared on the same traffic. Timings are host
+timings and only meaningful relative to each other.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import hostsim  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def replay(messages, speed='max', repeat=1):
+    """Feed messages through main.handle_message.
+
+    Returns (elapsed, latencies, heap peaks, frames transmitted, errors), where errors lists
+    the exceptions raised by handlers; a failing message does not stop the replay.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        firmware, radio = hostsim.load_firmware()
+
+    latencies = []
+    allocations = []
+    errors = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        previous_ticks = None
+        for message in messages:
+            if speed == 'recorded' and previous_ticks is not None:
+                time.sleep(((message['ticks'] - previous_ticks) % hostsim.TICKS_PERIOD) / 1000)
+            previous_ticks = message['ticks']
+
+            t0 = time.perf_counter()
+            with hostsim.HeapPeak() as heap, contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    firmware.handle_message(message)
+                except Exception as e:
+                    errors.append(e)
+            latencies.append(time.perf_counter() - t0)
+            allocations.append(heap.bytes)
+    elapsed = time.perf_counter() - start
+    return elapsed, latencies, allocations, len(radio.transmitted), errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('capture', help='capture file written by zb.capture.FrameCapture')
+    parser.add_argument('--speed', choices=('recorded', 'max'), default='max',
+                        help='honour recorded inter-arrival times or replay back to back')
+    parser.add_argument('--repeat', type=int, default=1, help='replay the capture this many times')
+    args = parser.parse_args(argv)
+
+    hostsim.install()
+    from zb.capture import read_capture
+
+    captured = read_capture(os.path.abspath(args.capture))
+    # A cut payload would be decoded as a different, malformed frame
+    messages = [message for message in captured if not message['truncated']]
+    if not messages:
+        print('{} contains no complete messages'.format(args.capture))
+        return 1
+
+    with hostsim.flash_dir():
+        elapsed, latencies, _, transmitted, errors = replay(messages, args.speed, args.repeat)
+        tracemalloc.start()
+        _, _, allocations, _, _ = replay(messages, 'max', 1)
+        tracemalloc.stop()
+
+    count = len(latencies)
+    print('messages:     {} ({} captured x {}, {} truncated skipped)'.format(
+        count, len(messages), args.repeat, len(captured) - len(messages)))
+    print('transmitted:  {} frames'.format(transmitted))
+    print('elapsed:      {:.3f} s'.format(elapsed))
+    print('throughput:   {:.1f} msg/s, {} handler errors'.format(count / elapsed, len(errors)))
+    if errors:
+        print('first error:  {!r}'.format(errors[0]))
+    print('latency (ms): min {:.3f}  p50 {:.3f}  p90 {:.3f}  p99 {:.3f}  max {:.3f}'.format(
+        min(latencies) * 1000, percentile(latencies, 50) * 1000, percentile(latencies, 90) * 1000,
+        percentile(latencies, 99) * 1000, max(latencies) * 1000))
+    print('heap peak per message (bytes): p50 {}  max {}  total {}'.format(
+        percentile(allocations, 50), max(allocations), sum(allocations)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
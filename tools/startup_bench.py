@@ -0,0 +1,107 @@
+"""Measure firmware boot on the host, through the first message served by the receive loop.
+
+    python tools/startup_bench.py [--runs N] [--target-ms MS]
+
+Each run unloads main.py and zb and boots cold through the same path as
+main(): import, start(), then service() passes of the receive loop. An On
+command to the first relay is queued before boot, i.e. what a relay has to
+act on after a power cycle, so the first pass serves it; the deferred initial
+state reports go out on the following idle pass and are timed separately.
+Timings are host timings and only meaningful relative to each other;
+--target-ms makes the exit status fail when the median time to the first
+served message exceeds it.
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import hostsim  # noqa: E402
+
+PHASES = ('import', 'start', 'first message', 'initial reports')
+# Phases up to and including the first served message
+SERVING_PHASES = 3
+
+FIRST_MESSAGE = {
+    'cluster': 0x0006,
+    'source_ep': 0x01,
+    'dest_ep': 0xc0,
+    'profile': 260,
+    'broadcast': False,
+    'sender_nwk': 0x0000,
+    'sender_eui64': bytes(8),
+    'payload': b'\x01\x01\x01',     # cluster command, tsn 1, on
+}
+
+
+def startup_once():
+    """Return per phase durations in seconds and heap peaks in bytes for one cold boot."""
+    hostsim.unload_firmware()
+    radio = hostsim.install()
+    radio.rx.append(dict(FIRST_MESSAGE))
+    durations = []
+    peaks = []
+
+    def phase(step):
+        t0 = time.perf_counter()
+        with hostsim.HeapPeak() as heap:
+            result = step()
+        durations.append(time.perf_counter() - t0)
+        peaks.append(heap.bytes)
+        return result
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        firmware = phase(lambda: importlib.import_module('main'))
+        phase(firmware.start)
+
+        phase(firmware.service)
+        if radio.rx or len(radio.transmitted) != 1:
+            raise RuntimeError('first receive loop pass did not serve the queued command')
+
+        phase(firmware.service)
+        if len(radio.transmitted) != 1 + firmware.relay_count:
+            raise RuntimeError('first idle pass did not send the initial state reports')
+    return durations, peaks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20, help='number of cold boots to measure')
+    parser.add_argument('--target-ms', type=float,
+                        help='fail if the median time to the first served message exceeds this')
+    args = parser.parse_args(argv)
+
+    runs = []
+    with hostsim.flash_dir():
+        tracemalloc.start()
+        try:
+            for _ in range(args.runs):
+                runs.append(startup_once())
+        finally:
+            tracemalloc.stop()
+
+    for i, name in enumerate(PHASES):
+        times = sorted(durations[i] for durations, _ in runs)
+        peak = max(peaks[i] for _, peaks in runs)
+        print('{:<15} median {:8.3f} ms  max {:8.3f} ms  heap peak {} bytes'.format(
+            name, times[len(times) // 2] * 1000, times[-1] * 1000, peak))
+
+    totals = sorted(sum(durations[:SERVING_PHASES]) for durations, _ in runs)
+    median_total_ms = totals[len(totals) // 2] * 1000
+    print('{:<15} median {:8.3f} ms'.format('boot to served', median_total_ms))
+
+    if args.target_ms is not None:
+        passed = median_total_ms <= args.target_ms
+        print('target {:.3f} ms: {}'.format(args.target_ms, 'pass' if passed else 'FAIL'))
+        return 0 if passed else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
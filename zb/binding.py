@@ -0,0 +1,78 @@
+import struct
+
+import zb.zdo as zdo
+
+# src_ep, cluster, dst_ieee (big endian, as used by xbee.transmit), dst_ep
+RECORD_FORMAT = "<BH8sB"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+
+class BindingTable:
+    """Unicast binding table persisted to flash as fixed size records.
+
+    Entries are kept in insertion order for Mgmt_Bind_req paging, and indexed
+    by (src_ep, cluster) so the reporting path does a single dict lookup.
+    """
+
+    def __init__(self, path="bindings.bin", capacity=16):
+        self.path = path
+        self.capacity = capacity
+        self._entries = []
+        self._index = {}
+        self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            data = b""
+
+        self._entries = [struct.unpack_from(RECORD_FORMAT, data, offset)
+                         for offset in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE)]
+        self._reindex()
+
+    def save(self):
+        with open(self.path, "wb") as f:
+            for entry in self._entries:
+                f.write(struct.pack(RECORD_FORMAT, *entry))
+
+    def _reindex(self):
+        self._index = {}
+        for src_ep, cluster, dst, dst_ep in self._entries:
+            self._index.setdefault((src_ep, cluster), []).append((dst, dst_ep))
+
+    def bind(self, src_ep, cluster, dst, dst_ep):
+        entry = (src_ep, cluster, bytes(dst), dst_ep)
+        if entry in self._entries:
+            return zdo.Status.SUCCESS
+        if len(self._entries) >= self.capacity:
+            return zdo.Status.TABLE_FULL
+
+        self._entries.append(entry)
+        self._reindex()
+        self.save()
+        return zdo.Status.SUCCESS
+
+    def unbind(self, src_ep, cluster, dst, dst_ep):
+        entry = (src_ep, cluster, bytes(dst), dst_ep)
+        if entry not in self._entries:
+            return zdo.Status.NO_ENTRY
+
+        self._entries.remove(entry)
+        self._reindex()
+        self.save()
+        return zdo.Status.SUCCESS
+
+    def lookup(self, src_ep, cluster):
+        """Return the (dst_ieee, dst_ep) targets bound to src_ep / cluster."""
+        return self._index.get((src_ep, cluster), ())
+
+    def entries(self, start_index=0, count=None):
+        """Return (src_ep, cluster, dst_ieee, dst_ep) records for a Mgmt_Bind_rsp page."""
+        if count is None:
+            return self._entries[start_index:]
+        return self._entries[start_index:start_index + count]
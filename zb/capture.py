@@ -0,0 +1,168 @@
+import struct
+
+MAGIC = b"ZBC3"
+# magic, ring size in bytes, offset the previous lap ended at, largest stored payload
+HEADER_FORMAT = "<4sIIH"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+LAP_END_OFFSET = 8
+# seq, ticks_ms, cluster, source_ep, dest_ep, profile, broadcast, sender_nwk, sender_eui64,
+# received payload length (the stored payload is cut to max_payload)
+RECORD_FORMAT = "<IIHBBHBH8sH"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+# Every record ends with its own size so the previous lap can be walked backwards
+TAG_FORMAT = "<H"
+TAG_SIZE = struct.calcsize(TAG_FORMAT)
+# Room for the largest (fragmented) APS payload the radio delivers
+MAX_PAYLOAD = 255
+# About a thousand typical on / off and ZDO requests
+CAPACITY = 32768
+
+
+def _record_at(f, offset, capacity, max_payload):
+    """Return (header fields, stored payload length, record size) of a valid record at offset, else None."""
+    if offset + RECORD_SIZE + TAG_SIZE > capacity:
+        return None
+    f.seek(HEADER_SIZE + offset)
+    fields = struct.unpack(RECORD_FORMAT, f.read(RECORD_SIZE))
+    stored = min(fields[-1], max_payload)
+    size = RECORD_SIZE + stored + TAG_SIZE
+    if fields[0] == 0 or offset + size > capacity:
+        return None
+    f.seek(HEADER_SIZE + offset + size - TAG_SIZE)
+    if struct.unpack(TAG_FORMAT, f.read(TAG_SIZE))[0] != size:
+        return None
+    return fields, stored, size
+
+
+def _current_lap(f, capacity, max_payload):
+    """Yield (offset, header fields, stored payload length, record size) for the lap being written."""
+    offset = 0
+    seq = None
+    while True:
+        record = _record_at(f, offset, capacity, max_payload)
+        if record is None or (seq is not None and record[0][0] != seq + 1):
+            return
+        yield (offset,) + record
+        seq = record[0][0]
+        offset += record[2]
+
+
+class FrameCapture:
+    """Ring buffer of received messages in a preallocated flash file.
+
+    Records hold the received payload only, so they are written back to back;
+    one that does not fit before the end of the ring starts a new lap at
+    offset 0, the only time the file header is rewritten. Records carry
+    consecutive sequence numbers, so the write position is recovered by
+    walking the current lap when the file is reopened.
+    """
+
+    def __init__(self, path="capture.bin", capacity=CAPACITY, max_payload=MAX_PAYLOAD):
+        if capacity < RECORD_SIZE + max_payload + TAG_SIZE:
+            raise ValueError("capture capacity {} cannot hold a {} byte payload".format(capacity, max_payload))
+        self.path = path
+        self.capacity = capacity
+        self.max_payload = max_payload
+        self.seq = 0
+        self.offset = 0
+        self._file = self._open()
+        if self._file is None:
+            self._file = self._create()
+        else:
+            self._recover()
+
+    def _open(self):
+        try:
+            f = open(self.path, "r+b")
+        except OSError:
+            return None
+        header = f.read(HEADER_SIZE)
+        if len(header) == HEADER_SIZE:
+            magic, capacity, _lap_end, max_payload = struct.unpack(HEADER_FORMAT, header)
+            if (magic, capacity, max_payload) == (MAGIC, self.capacity, self.max_payload):
+                return f
+        f.close()
+        return None
+
+    def _create(self):
+        f = open(self.path, "w+b")
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, self.capacity, 0, self.max_payload))
+        empty = bytes(256)
+        for _ in range(self.capacity // len(empty)):
+            f.write(empty)
+        f.write(bytes(self.capacity % len(empty)))
+        f.flush()
+        return f
+
+    def _recover(self):
+        for offset, fields, _stored, size in _current_lap(self._file, self.capacity, self.max_payload):
+            self.seq = fields[0]
+            self.offset = offset + size
+
+    def record(self, message, ticks):
+        payload = message['payload'][:self.max_payload]
+        size = RECORD_SIZE + len(payload) + TAG_SIZE
+        if self.offset + size > self.capacity:
+            # Remember where this lap ends so read_capture can still find its newest records
+            self._file.seek(LAP_END_OFFSET)
+            self._file.write(struct.pack("<I", self.offset))
+            self.offset = 0
+        self.seq += 1
+        record = struct.pack(RECORD_FORMAT, self.seq, ticks & 0xFFFFFFFF, message['cluster'],
+                             message['source_ep'], message['dest_ep'], message['profile'],
+                             1 if message['broadcast'] else 0, message['sender_nwk'] or 0,
+                             message['sender_eui64'] or bytes(8), len(message['payload']))
+        self._file.seek(HEADER_SIZE + self.offset)
+        self._file.write(record + payload + struct.pack(TAG_FORMAT, size))
+        self._file.flush()
+        self.offset += size
+
+    def close(self):
+        self._file.close()
+
+
+def read_capture(path):
+    """Return the captured messages, oldest first, as xbee.receive() style dicts.
+
+    Each dict also has 'ticks', and 'truncated' which is True when the payload was cut to max_payload.
+    """
+    with open(path, "rb") as f:
+        magic, capacity, lap_end, max_payload = struct.unpack(HEADER_FORMAT, f.read(HEADER_SIZE))
+        if magic != MAGIC:
+            raise ValueError("{} is not a frame capture".format(path))
+
+        records = list(_current_lap(f, capacity, max_payload))
+        head = records[-1][0] + records[-1][3] if records else 0
+        seq = records[0][1][0] if records else None
+
+        # What the current lap has not overwritten yet of the previous one, newest first
+        previous = []
+        end = lap_end
+        while end - RECORD_SIZE - TAG_SIZE >= head:
+            f.seek(HEADER_SIZE + end - TAG_SIZE)
+            size = struct.unpack(TAG_FORMAT, f.read(TAG_SIZE))[0]
+            record = _record_at(f, end - size, capacity, max_payload) if end - size >= head else None
+            if record is None or record[2] != size or (seq is not None and record[0][0] != seq - 1):
+                break
+            previous.append((end - size,) + record)
+            seq = record[0][0]
+            end -= size
+        previous.reverse()
+
+        messages = []
+        for offset, fields, stored, _size in previous + records:
+            _seq, ticks, cluster, source_ep, dest_ep, profile, broadcast, sender_nwk, sender_eui64, length = fields
+            f.seek(HEADER_SIZE + offset + RECORD_SIZE)
+            messages.append({
+                'ticks': ticks,
+                'cluster': cluster,
+                'source_ep': source_ep,
+                'dest_ep': dest_ep,
+                'profile': profile,
+                'broadcast': bool(broadcast),
+                'sender_nwk': sender_nwk,
+                'sender_eui64': sender_eui64,
+                'payload': f.read(stored),
+                'truncated': length > stored,
+            })
+    return messages
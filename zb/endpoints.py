@@ -0,0 +1,44 @@
+PROFILE_WILDCARD = 0xFFFF
+
+
+class EndpointTable:
+    """Declarative description of the application endpoints on this node.
+
+    Endpoints are added once at startup; the active endpoint list and the
+    cluster -> endpoint indices used to answer Match_Desc_req are built then,
+    so discovery requests only do lookups.
+    """
+
+    def __init__(self):
+        self.active = []
+        self._descriptors = {}
+        self._input_index = {}
+        self._output_index = {}
+
+    def __len__(self):
+        return len(self.active)
+
+    def add(self, endpoint, profile, device_type, device_version, input_clusters=(), output_clusters=()):
+        self._descriptors[endpoint] = (endpoint, profile, device_type, device_version,
+                                       list(input_clusters), list(output_clusters))
+        self.active.append(endpoint)
+        self.active.sort()
+        for cluster in input_clusters:
+            self._input_index.setdefault(cluster, []).append(endpoint)
+        for cluster in output_clusters:
+            self._output_index.setdefault(cluster, []).append(endpoint)
+
+    def simple_descriptor(self, endpoint):
+        """Return SimpleDescriptor field values for endpoint, or None if it is not active."""
+        return self._descriptors.get(endpoint)
+
+    def match(self, profile, input_clusters, output_clusters):
+        """Return the endpoints matching a Match_Desc_req, in ascending order."""
+        found = set()
+        for cluster in input_clusters:
+            found.update(self._input_index.get(cluster, ()))
+        for cluster in output_clusters:
+            found.update(self._output_index.get(cluster, ()))
+        if profile != PROFILE_WILDCARD:
+            found = [ep for ep in found if self._descriptors[ep][1] == profile]
+        return sorted(found)
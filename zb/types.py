@@ -74,19 +74,29 @@ class _LVList(_List):
         return r, data
 
 
+# Classes made by the factories below, so each schema type is only built once
+_class_cache = {}
+
+
 def List(itemtype):  # noqa: N802
-    class List(_List):
-        _itemtype = itemtype
+    key = ("List", itemtype)
+    if key not in _class_cache:
+        class List(_List):
+            _itemtype = itemtype
 
-    return List
+        _class_cache[key] = List
+    return _class_cache[key]
 
 
 def LVList(itemtype, prefix_length=1):  # noqa: N802
-    class LVList(_LVList):
-        _itemtype = itemtype
-        _prefix_length = prefix_length
+    key = ("LVList", itemtype, prefix_length)
+    if key not in _class_cache:
+        class LVList(_LVList):
+            _itemtype = itemtype
+            _prefix_length = prefix_length
 
-    return LVList
+        _class_cache[key] = LVList
+    return _class_cache[key]
 
 
 class _FixedList(_List):
@@ -100,25 +110,31 @@ class _FixedList(_List):
 
 
 def fixed_list(length, itemtype):
-    class FixedList(_FixedList):
-        _length = length
-        _itemtype = itemtype
+    key = ("FixedList", length, itemtype)
+    if key not in _class_cache:
+        class FixedList(_FixedList):
+            _length = length
+            _itemtype = itemtype
 
-    return FixedList
+        _class_cache[key] = FixedList
+    return _class_cache[key]
 
 
 def Optional(optional_item_type):
-    class Optional(optional_item_type):
-        optional = True
+    key = ("Optional", optional_item_type)
+    if key not in _class_cache:
+        class Optional(optional_item_type):
+            optional = True
 
-        @classmethod
-        def deserialize(cls, data):
-            try:
-                return super().deserialize(data)
-            except ValueError:
-                return None, b""
+            @classmethod
+            def deserialize(cls, data):
+                try:
+                    return super().deserialize(data)
+                except ValueError:
+                    return None, b""
 
-    return Optional
+        _class_cache[key] = Optional
+    return _class_cache[key]
 
 
 class EUI64_T(fixed_list(8, uint8_t)):
@@ -148,27 +164,18 @@ class HexRepr:
 
 class Struct:
     def __init__(self, *args, **kwargs):
-        print('*******************************\n__init__ called with args ', args)
-        print(self.__class__)
-        print(type(args[0]))
-        print(len(args))
         if len(args) == 1 and isinstance(args[0], self.__class__):
-            print('copy constructor called')
             # copy constructor
             for field in self._fields:
                 setattr(self, field[0], getattr(args[0], field[0]))
         elif len(args) == len(self._fields):
-            print('standard constructor called')
             for field, value in zip(self._fields, args):
                 setattr(self, field[0], field[1](value))
         elif not args:
-            print('constructor called without args')
             for field in self._fields:
                 setattr(self, field[0], None)
-        print('*******************************\nexiting __init__')
 
     def serialize(self):
-        print(self)
         r = b""
         for field in self._fields:
             r += getattr(self, field[0]).serialize()
@@ -196,7 +203,6 @@ class Struct:
 def deserialize_cluster_fields(data, schema):
     result = []
     for type_ in schema:
-        print(type_)
         value, data = type_.deserialize(data)
         result.append(value)
     return result, data
@@ -28,6 +28,9 @@ class NodeDescriptor(t.Struct):
 
 class SizePrefixedSimpleDescriptor(SimpleDescriptor):
     def serialize(self):
+        if self.endpoint is None:
+            # Constructed without args: no descriptor, e.g. a NOT_ACTIVE Simple_Desc_rsp
+            return b"\x00"
         data = super().serialize()
         return len(data).to_bytes(1, "little") + data
 
@@ -42,6 +45,60 @@ class NWK_T(t.HexRepr, t.uint16_t):
     pass
 
 
+class MultiAddress:
+    """Used for binds, represents a group NWK address or an IEEE address and endpoint."""
+
+    Group = 0x01
+    IEEE = 0x03
+
+    def __init__(self, addrmode=None, nwk=None, ieee=None, endpoint=None):
+        if isinstance(addrmode, MultiAddress):
+            # copy constructor
+            addrmode, nwk, ieee, endpoint = addrmode.addrmode, addrmode.nwk, addrmode.ieee, addrmode.endpoint
+        self.addrmode = addrmode
+        self.nwk = nwk
+        self.ieee = ieee
+        self.endpoint = endpoint
+
+    def serialize(self):
+        r = t.uint8_t(self.addrmode).serialize()
+        if self.addrmode == self.Group:
+            return r + NWK_T(self.nwk).serialize()
+        elif self.addrmode == self.IEEE:
+            return r + t.EUI64_T(self.ieee).serialize() + t.uint8_t(self.endpoint).serialize()
+        raise ValueError("Invalid address mode {}".format(self.addrmode))
+
+    @classmethod
+    def deserialize(cls, data):
+        addrmode, data = t.uint8_t.deserialize(data)
+        if addrmode == cls.Group:
+            nwk, data = NWK_T.deserialize(data)
+            return cls(addrmode, nwk=nwk), data
+        elif addrmode == cls.IEEE:
+            ieee, data = t.EUI64_T.deserialize(data)
+            endpoint, data = t.uint8_t.deserialize(data)
+            return cls(addrmode, ieee=ieee, endpoint=endpoint), data
+        # Reserved mode, the address length is unknown so the rest of the frame is consumed.
+        # Handlers reject anything other than Group / IEEE.
+        return cls(addrmode), b""
+
+    def __repr__(self):
+        if self.addrmode == self.Group:
+            return "<MultiAddress group={}>".format(self.nwk)
+        elif self.addrmode != self.IEEE:
+            return "<MultiAddress addrmode={}>".format(self.addrmode)
+        return "<MultiAddress ieee={!r} endpoint={}>".format(self.ieee, self.endpoint)
+
+
+class Binding(t.Struct):
+    _fields = [
+        ("SrcAddress", t.EUI64_T),
+        ("SrcEndpoint", t.uint8_t),
+        ("ClusterId", t.uint16_t),
+        ("DstAddress", MultiAddress),
+    ]
+
+
 NWK = ("NWKAddr", NWK_T)
 NWKI = ("NWKAddrOfInterest", NWK_T)
 IEEE = ("IEEEAddr", t.EUI64_T)
@@ -93,7 +150,7 @@ class ZDOCmd:
     # Power_Desc_req = 0x0003
     Simple_Desc_req = 0x0004
     Active_EP_req = 0x0005
-    # Match_Desc_req = 0x0006
+    Match_Desc_req = 0x0006
     # Complex_Desc_req = 0x0010
     # User_Desc_req = 0x0011
     # Discovery_Cache_req = 0x0012
@@ -107,17 +164,17 @@ class ZDOCmd:
     # Remove_node_cache_req = 0x001B
     # Find_node_cache_req = 0x001C
     # Extended_Simple_Desc_req = 0x001D
-    # Extended_Active_EP_req = 0x001E
+    Extended_Active_EP_req = 0x001E
     # Parent_annce = 0x001F
     # #  Bind Management Server Services Responses
     # End_Device_Bind_req = 0x0020
-    # Bind_req = 0x0021
-    # Unbind_req = 0x0022
+    Bind_req = 0x0021
+    Unbind_req = 0x0022
     # # Network Management Server Services Requests
     # # ... TODO optional stuff ...
     # Mgmt_Lqi_req = 0x0031
     # Mgmt_Rtg_req = 0x0032
-    # # ... TODO optional stuff ...
+    Mgmt_Bind_req = 0x0033
     # Mgmt_Leave_req = 0x0034
     # Mgmt_Permit_Joining_req = 0x0036
     # Mgmt_NWK_Update_req = 0x0038
@@ -131,7 +188,7 @@ class ZDOCmd:
     # Power_Desc_rsp = 0x8003
     Simple_Desc_rsp = 0x8004
     Active_EP_rsp = 0x8005
-    # Match_Desc_rsp = 0x8006
+    Match_Desc_rsp = 0x8006
     # Complex_Desc_rsp = 0x8010
     # User_Desc_rsp = 0x8011
     # Discovery_Cache_rsp = 0x8012
@@ -145,27 +202,36 @@ class ZDOCmd:
     # Remove_node_cache_rsp = 0x801B
     # Find_node_cache_rsp = 0x801C
     # Extended_Simple_Desc_rsp = 0x801D
-    # Extended_Active_EP_rsp = 0x801E
+    Extended_Active_EP_rsp = 0x801E
     # Parent_annce_rsp = 0x801F
     # #  Bind Management Server Services Responses
     # End_Device_Bind_rsp = 0x8020
-    # Bind_rsp = 0x8021
-    # Unbind_rsp = 0x8022
+    Bind_rsp = 0x8021
+    Unbind_rsp = 0x8022
     # # ... TODO optional stuff ...
     # # Network Management Server Services Responses
     # Mgmt_Lqi_rsp = 0x8031
     # Mgmt_Rtg_rsp = 0x8032
-    # # ... TODO optional stuff ...
+    Mgmt_Bind_rsp = 0x8033
     # Mgmt_Leave_rsp = 0x8034
     # Mgmt_Permit_Joining_rsp = 0x8036
     # # ... TODO optional stuff ...
     # Mgmt_NWK_Update_rsp = 0x8038
 
 
+# Schema templates are built on first use by cluster_schema(), so importing this
+# module does not create the LVList / Optional classes for every command.
 CLUSTERS = {
-    ZDOCmd.Simple_Desc_req: (NWKI, ("EndPoint", t.uint8_t)),
-    ZDOCmd.Active_EP_req: (NWKI,),
-    # ZDOCmd.NWK_addr_rsp: (
+    ZDOCmd.Simple_Desc_req: lambda: (NWKI, ("EndPoint", t.uint8_t)),
+    ZDOCmd.Active_EP_req: lambda: (NWKI,),
+    ZDOCmd.Match_Desc_req: lambda: (
+        NWKI,
+        ("ProfileID", t.uint16_t),
+        ("InClusterList", t.LVList(t.uint16_t)),
+        ("OutClusterList", t.LVList(t.uint16_t)),
+    ),
+    ZDOCmd.Extended_Active_EP_req: lambda: (NWKI, ("StartIndex", t.uint8_t)),
+    # ZDOCmd.NWK_addr_rsp: lambda: (
     #     STATUS,
     #     IEEE,
     #     NWK,
@@ -173,7 +239,7 @@ CLUSTERS = {
     #     ("StartIndex", t.Optional(t.uint8_t)),
     #     ("NWKAddressAssocDevList", t.Optional(t.List(NWK))),
     # ),
-    # ZDOCmd.IEEE_addr_rsp: (
+    # ZDOCmd.IEEE_addr_rsp: lambda: (
     #     STATUS,
     #     IEEE,
     #     NWK,
@@ -181,31 +247,67 @@ CLUSTERS = {
     #     ("StartIndex", t.Optional(t.uint8_t)),
     #     ("NWKAddrAssocDevList", t.Optional(t.List(NWK))),
     # ),
-    # ZDOCmd.Node_Desc_rsp: (
+    # ZDOCmd.Node_Desc_rsp: lambda: (
     #     STATUS,
     #     NWKI,
     #     ("NodeDescriptor", t.Optional(NodeDescriptor)),
     # ),
-    ZDOCmd.Device_annce: (NWK, IEEE, ("Capability", t.uint8_t)),
-    ZDOCmd.Simple_Desc_rsp: (
+    ZDOCmd.Device_annce: lambda: (NWK, IEEE, ("Capability", t.uint8_t)),
+    ZDOCmd.Simple_Desc_rsp: lambda: (
         STATUS,
         NWKI,
         ("SimpleDescriptor", t.Optional(SizePrefixedSimpleDescriptor)),
     ),
-    ZDOCmd.Active_EP_rsp: (STATUS, NWKI, ("ActiveEPList", t.LVList(t.uint8_t)))
+    ZDOCmd.Active_EP_rsp: lambda: (STATUS, NWKI, ("ActiveEPList", t.LVList(t.uint8_t))),
+    ZDOCmd.Match_Desc_rsp: lambda: (STATUS, NWKI, ("MatchList", t.LVList(t.uint8_t))),
+    ZDOCmd.Extended_Active_EP_rsp: lambda: (
+        STATUS,
+        NWKI,
+        ("ActiveEPCount", t.uint8_t),
+        ("StartIndex", t.uint8_t),
+        ("AppEPList", t.List(t.uint8_t)),
+    ),
+    ZDOCmd.Bind_req: lambda: (
+        ("SrcAddress", t.EUI64_T),
+        ("SrcEndpoint", t.uint8_t),
+        ("ClusterID", t.uint16_t),
+        ("DstAddress", MultiAddress),
+    ),
+    ZDOCmd.Unbind_req: lambda: (
+        ("SrcAddress", t.EUI64_T),
+        ("SrcEndpoint", t.uint8_t),
+        ("ClusterID", t.uint16_t),
+        ("DstAddress", MultiAddress),
+    ),
+    ZDOCmd.Mgmt_Bind_req: lambda: (("StartIndex", t.uint8_t),),
+    ZDOCmd.Bind_rsp: lambda: (STATUS,),
+    ZDOCmd.Unbind_rsp: lambda: (STATUS,),
+    ZDOCmd.Mgmt_Bind_rsp: lambda: (
+        STATUS,
+        ("BindingTableEntries", t.uint8_t),
+        ("StartIndex", t.uint8_t),
+        ("BindingTableList", t.LVList(Binding)),
+    ),
 }
 
-# Rewrite to (name, param_names, param_types)
-for command_id, schema_template in CLUSTERS.items():
-    param_names = [p[0] for p in schema_template]
-    param_types = [p[1] for p in schema_template]
-    CLUSTERS[command_id] = (param_names, param_types)
+_schemas = {}
+
+
+def cluster_schema(cluster_id):
+    """Return (param_names, param_types) for cluster_id, raising KeyError if it is unknown."""
+    try:
+        return _schemas[cluster_id]
+    except KeyError:
+        schema_template = CLUSTERS[cluster_id]()
+        schema = ([p[0] for p in schema_template], [p[1] for p in schema_template])
+        _schemas[cluster_id] = schema
+        return schema
 
 
 def deserialize_frame(cluster_id, data):
     tsn, data = t.uint8_t.deserialize(data)
     try:
-        cluster_details = CLUSTERS[cluster_id]
+        cluster_details = cluster_schema(cluster_id)
     except KeyError:
         print("Unknown ZDO cluster {:04X}".format(cluster_id))
         return tsn, data
@@ -218,12 +320,12 @@ def deserialize_frame(cluster_id, data):
 
 def serialize_frame(tsn, cluster_id, *args):
     tsn_data = t.uint8_t(tsn).serialize()
-    schema = CLUSTERS[cluster_id][1]
+    schema = cluster_schema(cluster_id)[1]
     data = t.serialize_cluster_fields(args, schema)
     return tsn_data + data
 
 
 def param_schema(cluster_id, index):
-    _param_names, _param_types = CLUSTERS[cluster_id]
+    _param_names, _param_types = cluster_schema(cluster_id)
     print(_param_names, _param_types)
     return _param_names[index], _param_types[index]
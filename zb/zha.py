@@ -154,6 +154,8 @@ def deserialize_frame(cluster_id, data):
     elif frc.frame_type == FrameType.GLOBAL_COMMAND:
         if command_id == 0x0:       # Read attributes request
             schema = (t.List(t.uint16_t),)
+        elif command_id == 0x0c:    # Discover attributes request
+            schema = (t.uint16_t, t.uint8_t)
         elif command_id == 0x0b:    # default response to report attributes
             schema = (t.uint8_t,)
         else:
@@ -169,21 +171,48 @@ def deserialize_frame(cluster_id, data):
     return frc, tsn, command_id, args, data
 
 
-def serialize_on_off_report(tsn, on):
-    frc = FrameControl.general()
-    frc.disable_default_response = True
-    attribute_id = t.uint16_t(0x000)  # on off attribute id
-    attribute_type = t.uint8_t(0x10)  # boolean type id
-    attribute_value = t.uint8_t(1 if on else 0)
+def pack_records(header, records, max_payload):
+    """Pack serialized records behind header into as few frames as fit in max_payload bytes.
 
-    attribute_data = attribute_id.serialize() + attribute_type.serialize() + attribute_value.serialize()
-    return frc.serialize() + t.uint8_t(tsn).serialize() + t.uint8_t(0x0A).serialize() + attribute_data
+    Records are never split, so a record too large for an empty frame is sent on its own.
+    """
+    frames = []
+    frame = [header]
+    size = len(header)
+    for record in records:
+        if size + len(record) > max_payload and len(frame) > 1:
+            frames.append(b"".join(frame))
+            frame = [header]
+            size = len(header)
+        frame.append(record)
+        size += len(record)
+    if len(frame) > 1 or not frames:
+        frames.append(b"".join(frame))
+    return frames
 
 
-def serialize_attribute_response(tsn, on, attributes):
-    frc = FrameControl.general()
+def serialize_attribute_report(tsn, records, max_payload):
+    """Return Report Attributes frames for (attribute id, type id, value) records."""
+    frc = FrameControl.general(is_reply=True)
+    header = frc.serialize() + t.uint8_t(tsn).serialize() + t.uint8_t(0x0A).serialize()
 
-    data = frc.serialize() + t.uint8_t(tsn).serialize() + t.uint8_t(0x01).serialize()
+    records = [t.uint16_t(attribute_id).serialize() + t.uint8_t(attribute_type).serialize() + attribute_value
+               for attribute_id, attribute_type, attribute_value in records]
+    return pack_records(header, records, max_payload)
+
+
+def serialize_on_off_report(tsn, on, max_payload):
+    attribute_value = t.uint8_t(1 if on else 0).serialize()
+    # boolean type id
+    return serialize_attribute_report(tsn, ((0x0000, 0x10, attribute_value),), max_payload)
+
+
+def serialize_attribute_response(tsn, on, attributes, max_payload):
+    """Return Read Attributes Response frames, split so that none exceed max_payload bytes."""
+    frc = FrameControl.general(is_reply=True)
+    header = frc.serialize() + t.uint8_t(tsn).serialize() + t.uint8_t(0x01).serialize()
+
+    records = []
     for attribute in attributes:
         attribute_id = t.uint16_t(attribute)  # on off attribute id
         if attribute == 0x000:
@@ -191,14 +220,30 @@ def serialize_attribute_response(tsn, on, attributes):
             attribute_type = t.uint8_t(0x10)  # boolean type id
             attribute_value = t.uint8_t(1 if on else 0)
 
-            attribute_data = attribute_id.serialize() + attribute_status.serialize() + \
-                             attribute_type.serialize() + attribute_value.serialize()
-
-            data += attribute_data
+            records.append(attribute_id.serialize() + attribute_status.serialize() +
+                           attribute_type.serialize() + attribute_value.serialize())
         else:
             attribute_status = t.uint8_t(0x86)      # Attribute not supported
 
-            attribute_data = attribute_id.serialize() + attribute_status.serialize()
-            data += attribute_data
+            records.append(attribute_id.serialize() + attribute_status.serialize())
+
+    return pack_records(header, records, max_payload)
+
+
+def serialize_discover_attributes_response(tsn, attributes, start_id, max_count, max_payload):
+    """Return a Discover Attributes Response for (attribute id, type id) pairs.
+
+    Discovery is a single frame, so as many records as fit are sent and discovery complete is
+    only set when nothing was left out; the client continues from the last id returned.
+    """
+    frc = FrameControl.general(is_reply=True)
+    header = frc.serialize() + t.uint8_t(tsn).serialize() + t.uint8_t(0x0D).serialize()
+
+    remaining = sorted(a for a in attributes if a[0] >= start_id)
+    fit = (max_payload - len(header) - 1) // 3  # discovery complete byte, 3 bytes per record
+    records = remaining[:min(max_count, fit)]
+    complete = t.uint8_t(1 if len(records) == len(remaining) else 0)
 
-    return data
+    return header + complete.serialize() + b"".join(
+        t.uint16_t(attribute_id).serialize() + t.uint8_t(attribute_type).serialize()
+        for attribute_id, attribute_type in records)